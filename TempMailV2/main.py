@@ -12,6 +12,8 @@ Features:
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import json
 import random
@@ -21,27 +23,61 @@ import sys
 import os
 import itertools
 import threading
+import tempfile
+import hashlib
+import shutil
+import socket
+import subprocess
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# ============================================================================
+#                           JSON SUPPORT
+# ============================================================================
+
+# Use orjson when available (much faster on large message bodies)
+try:
+    import orjson
+    loads = orjson.loads
+    dumps = orjson.dumps
+except ImportError:
+    loads = json.loads
+    def dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
 # ============================================================================
 #                           CLIPBOARD SUPPORT
 # ============================================================================
 
+def _resolve_copier():
+    """Pick the best available clipboard backend (probed once at startup)"""
+    try:
+        import pyperclip
+        return pyperclip.copy
+    except ImportError:
+        pass
+    
+    # Fallback to platform tools: Windows, macOS, then whichever display server is running
+    candidates = [['clip'], ['pbcopy']]
+    if os.environ.get('WAYLAND_DISPLAY'):
+        candidates.append(['wl-copy'])
+    if os.environ.get('DISPLAY'):
+        candidates += [['xclip', '-selection', 'clipboard'], ['xsel', '--clipboard', '--input']]
+    for cmd in candidates:
+        if shutil.which(cmd[0]):
+            return lambda text, cmd=cmd: subprocess.run(cmd, input=text.encode('utf-8'), check=True)
+    return None
+
+_COPY_FN = _resolve_copier()
+
 def copy_to_clipboard(text):
     """Copy text to clipboard (cross-platform)"""
+    if _COPY_FN is None:
+        return False
     try:
-        import pyperclip
-        pyperclip.copy(text)
+        _COPY_FN(text)
         return True
-    except ImportError:
-        # Fallback for Windows without pyperclip
-        try:
-            import subprocess
-            process = subprocess.Popen(['clip'], stdin=subprocess.PIPE)
-            process.communicate(text.encode('utf-8'))
-            return True
-        except:
-            return False
     except:
         return False
 
@@ -50,62 +86,181 @@ def copy_to_clipboard(text):
 # ============================================================================
 
 HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tempmail_history.json')
+DOMAINS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tempmail_domains.json')
+DOMAINS_TTL = 3600  # Domain list rarely changes, refresh hourly
+TOKEN_TTL = 3000    # Reuse a saved auth token for up to 50 minutes
+
+_history_cache = None
+_history_index = None  # email -> position in _history_cache['sessions']
+_history_mtime = None
+_history_dirty = False
+HISTORY_MAX_ITEMS = 50  # Keep only the most recent codes/links per session
+
+def _history_file_mtime():
+    try:
+        return os.stat(HISTORY_FILE).st_mtime_ns
+    except OSError:
+        return None
 
 def load_history():
-    """Load email history from file"""
+    """Load email history (re-read from file only when it changed on disk)"""
+    global _history_cache, _history_index, _history_mtime
+    mtime = _history_file_mtime()
+    # Pending in-memory changes win over the file until they are flushed
+    if _history_cache is not None and (_history_dirty or mtime == _history_mtime):
+        return _history_cache
+    
+    _history_cache = {"sessions": []}
+    _history_index = None
+    _history_mtime = mtime
     try:
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, 'r') as f:
-                return json.load(f)
+        if mtime is not None:
+            with open(HISTORY_FILE, 'rb') as f:
+                _history_cache = loads(f.read())
     except:
         pass
-    return {"sessions": []}
+    return _history_cache
 
 def save_history(history):
-    """Save email history to file"""
+    """Save email history to file atomically"""
+    global _history_cache, _history_index, _history_mtime, _history_dirty
+    if history is not _history_cache:
+        _history_cache = history
+        _history_index = None
+    tmp_path = None
     try:
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump(history, f, indent=2)
+        # Write to a temp file in the same dir and swap it in, so a crash
+        # mid-write never leaves a truncated history behind
+        with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(HISTORY_FILE),
+                                         suffix='.tmp', delete=False) as f:
+            tmp_path = f.name
+            f.write(dumps(history))
+        os.replace(tmp_path, HISTORY_FILE)
+        _history_mtime = _history_file_mtime()
+        _history_dirty = False
     except Exception as e:
+        # Don't leave a stray copy of the credentials next to the history file
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
         print(f"⚠️  Could not save history: {e}")
 
-def add_to_history(email, password, codes=None, links=None):
+def flush_history():
+    """Write pending history changes to disk"""
+    if _history_dirty and _history_cache is not None:
+        save_history(_history_cache)
+
+atexit.register(flush_history)
+
+def _session_index(history):
+    """Email -> session position map, rebuilt only when the cache was replaced"""
+    global _history_index
+    if _history_index is None:
+        _history_index = {s['email']: i for i, s in enumerate(history['sessions'])}
+    return _history_index
+
+def get_history_session(email):
+    """Return the saved session for email, or None"""
+    history = load_history()
+    idx = _session_index(history).get(email)
+    return history['sessions'][idx] if idx is not None else None
+
+def add_to_history(email, password, codes=None, links=None, token=None, account_id=None):
     """Add or update email in history"""
+    global _history_dirty
     history = load_history()
+    index = _session_index(history)
+    _history_dirty = True
     
     # Check if email already exists
-    for session in history['sessions']:
-        if session['email'] == email:
-            session['last_used'] = datetime.now().isoformat()
-            if codes:
-                session.setdefault('codes_received', []).extend(codes)
-            if links:
-                session.setdefault('links_received', []).extend(links)
-            save_history(history)
-            return
+    idx = index.get(email)
+    if idx is not None:
+        session = history['sessions'][idx]
+        session['last_used'] = datetime.now().isoformat()
+        if token:
+            session.update(token=token, token_ts=time.time(), account_id=account_id)
+        if codes:
+            session['codes_received'] = (session.get('codes_received', []) + codes)[-HISTORY_MAX_ITEMS:]
+        if links:
+            session['links_received'] = (session.get('links_received', []) + links)[-HISTORY_MAX_ITEMS:]
+        # A bare last_used touch can wait for exit; received codes/links can't
+        if codes or links:
+            flush_history()
+        return
     
     # Add new session
-    history['sessions'].append({
+    index[email] = len(history['sessions'])
+    session = {
         'email': email,
         'password': password,
         'created_at': datetime.now().isoformat(),
         'last_used': datetime.now().isoformat(),
-        'codes_received': codes or [],
-        'links_received': links or []
-    })
-    save_history(history)
+        'codes_received': (codes or [])[-HISTORY_MAX_ITEMS:],
+        'links_received': (links or [])[-HISTORY_MAX_ITEMS:]
+    }
+    if token:
+        session.update(token=token, token_ts=time.time(), account_id=account_id)
+    history['sessions'].append(session)
+    flush_history()
 
 # ============================================================================
 #                           TEMPMAIL SERVICE
 # ============================================================================
 
+# Code patterns in priority order, compiled once; the first one that matches wins
+_CODE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'(?:verification|verify|code|otp|pin)[:\s]+([A-Z0-9]{4,8})',
+    r'(?:code|otp|pin)\s*(?:is|:)\s*([A-Z0-9]{4,8})',
+    r'\b([0-9]{4,6})\b',
+    r'\b([A-Z0-9]{6})\b',
+)]
+
+_VERIFY_LINK_PATTERN = re.compile(
+    r'https?://[^\s<>"{}|\\^`\[\]]+(?:verify|confirm|activate|validation|auth)[^\s<>"{}|\\^`\[\]]*'
+    r'|https?://[^\s<>"{}|\\^`\[\]]*(?:token|code|key)=[^\s<>"{}|\\^`\[\]]+',
+    re.IGNORECASE
+)
+
+_ALL_LINKS_PATTERN = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+', re.IGNORECASE)
+
+_USERNAME_ALPHABET = string.ascii_lowercase + string.digits
+_PASSWORD_ALPHABET = string.ascii_letters + string.digits
+_RNG = random.SystemRandom()  # OS entropy - these become real account passwords
+
 class TempMailService:
     def __init__(self):
         self.base_url = 'https://api.mail.tm'
+        self.mercure_url = 'https://mercure.mail.tm/.well-known/mercure'
         self.session = requests.Session()
+        # Keep-alive pool plus retries for transient rate-limit/server errors.
+        # Only GETs are replayed (a repeated POST /accounts answers 422 "already
+        # used"), and read timeouts never are
+        retry = Retry(
+            total=3,
+            read=0,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET'])
+        )
+        self.session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+        # Requests made during a wait go out once: retries and Retry-After sleeps
+        # would run past the deadline, and the wait loops re-poll on their own
+        self._wait_session = requests.Session()
+        self._wait_session.headers = self.session.headers  # Same dict, so auth updates apply
+        self._wait_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0))
         self.current_email = None
         self.current_password = None
         self.auth_token = None
+        self.account_id = None
+        self._domains_cache = None
+        self._domains_cache_ts = 0
+        self._content_cache = {}  # message id -> parsed content (bodies never change)
+        self._extract_cache = {}  # message id -> (content, extract_all result)
+        self._inbox_cache = None  # last /messages result, for conditional GETs
+        self._executor = ThreadPoolExecutor(max_workers=8)
+        self._auth_lock = threading.Lock()
         
         self.session.headers.update({
             'Content-Type': 'application/json',
@@ -113,24 +268,60 @@ class TempMailService:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
     
+    @staticmethod
+    def _hydra_members(data):
+        """Items of a mail.tm collection response (hydra object or plain list)"""
+        if isinstance(data, dict) and 'hydra:member' in data:
+            return data['hydra:member']
+        return data if isinstance(data, list) else []
+    
     def get_available_domains(self):
-        """Get list of available email domains"""
+        """Get list of available email domains (cached for DOMAINS_TTL seconds)"""
+        if self._domains_cache and time.time() - self._domains_cache_ts < DOMAINS_TTL:
+            return self._domains_cache
+        
+        # Reuse the list persisted by a previous run if it is still fresh
+        cached = self._load_domains_file()
+        if cached:
+            return cached
+        
         try:
             response = self.session.get(f"{self.base_url}/domains", timeout=10)
             if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, dict) and 'hydra:member' in data:
-                    domains = data['hydra:member']
-                elif isinstance(data, list):
-                    domains = data
-                else:
-                    return []
-                return [d.get('domain', d) if isinstance(d, dict) else str(d) for d in domains]
+                domains = self._hydra_members(loads(response.content))
+                domains = [d.get('domain', d) if isinstance(d, dict) else str(d) for d in domains]
+                if domains:
+                    self._domains_cache = domains
+                    self._domains_cache_ts = time.time()
+                    self._save_domains_file()
+                return domains
             return []
         except Exception as e:
             print(f"❌ Error getting domains: {e}")
             return []
     
+    def _load_domains_file(self):
+        """Load domain list from disk if it is younger than DOMAINS_TTL"""
+        try:
+            if os.path.exists(DOMAINS_FILE):
+                with open(DOMAINS_FILE, 'rb') as f:
+                    data = loads(f.read())
+                if time.time() - data.get('fetched_at', 0) < DOMAINS_TTL and data.get('domains'):
+                    self._domains_cache = data['domains']
+                    self._domains_cache_ts = data['fetched_at']
+                    return self._domains_cache
+        except:
+            pass
+        return None
+    
+    def _save_domains_file(self):
+        """Persist domain list so the next run can skip the request"""
+        try:
+            with open(DOMAINS_FILE, 'wb') as f:
+                f.write(dumps({'fetched_at': self._domains_cache_ts, 'domains': self._domains_cache}))
+        except:
+            pass
+    
     def generate_email(self):
         """Generate a new temporary email address"""
         try:
@@ -139,10 +330,10 @@ class TempMailService:
                 print("❌ No domains available")
                 return None
             
-            username = ''.join(random.choices(string.ascii_lowercase + string.digits, k=10))
-            domain = random.choice(domains)
+            username = ''.join(_RNG.choices(_USERNAME_ALPHABET, k=10))
+            domain = _RNG.choice(domains)
             email = f"{username}@{domain}"
-            password = ''.join(random.choices(string.ascii_letters + string.digits, k=16))
+            password = ''.join(_RNG.choices(_PASSWORD_ALPHABET, k=16))
             
             # Create account
             response = self.session.post(
@@ -165,8 +356,22 @@ class TempMailService:
         """Login to existing email account"""
         return self._authenticate(email, password)
     
-    def _authenticate(self, email, password):
-        """Authenticate and get token"""
+    def _authenticate(self, email, password, force=False):
+        """Authenticate and get token (reuses a still-valid token unless force)"""
+        if not force:
+            # Already logged in to this account
+            if email == self.current_email and password == self.current_password and self.auth_token:
+                add_to_history(email, password)
+                return {'email': email, 'password': password, 'status': 'success'}
+            
+            # Token saved by an earlier login that hasn't expired yet
+            saved = get_history_session(email)
+            if (saved and saved.get('password') == password and saved.get('token')
+                    and time.time() - saved.get('token_ts', 0) < TOKEN_TTL):
+                self._set_auth(email, password, saved['token'], saved.get('account_id'))
+                add_to_history(email, password)
+                return {'email': email, 'password': password, 'status': 'success'}
+        
         try:
             token_response = self.session.post(
                 f"{self.base_url}/token",
@@ -175,17 +380,11 @@ class TempMailService:
             )
             
             if token_response.status_code == 200:
-                token_data = token_response.json()
-                self.auth_token = token_data.get('token')
-                self.current_email = email
-                self.current_password = password
-                
-                self.session.headers.update({
-                    'Authorization': f'Bearer {self.auth_token}'
-                })
+                token_data = loads(token_response.content)
+                self._set_auth(email, password, token_data.get('token'), token_data.get('id'))
                 
                 # Save to history
-                add_to_history(email, password)
+                add_to_history(email, password, token=self.auth_token, account_id=self.account_id)
                 
                 return {
                     'email': email,
@@ -199,21 +398,62 @@ class TempMailService:
             print(f"❌ Error authenticating: {e}")
             return None
     
-    def check_messages(self):
+    def _set_auth(self, email, password, token, account_id):
+        """Switch the session to the given account credentials"""
+        if email != self.current_email:
+            self._content_cache.clear()
+            self._extract_cache.clear()
+        self.auth_token = token
+        self.account_id = account_id
+        self.current_email = email
+        self.current_password = password
+        
+        self.session.headers.update({
+            'Authorization': f'Bearer {self.auth_token}'
+        })
+    
+    def _get(self, path, timeout, headers=None, deadline=None):
+        """GET an authenticated endpoint, re-logging in once if the token expired.
+        
+        With a deadline (inside a wait) each attempt goes out once, without
+        retries, and never runs past it.
+        """
+        session = self.session if deadline is None else self._wait_session
+        def send():
+            attempt_timeout = timeout if deadline is None else min(timeout, _request_timeout(deadline))
+            return session.get(f"{self.base_url}{path}", timeout=attempt_timeout, headers=headers)
+        
+        response = send()
+        if response.status_code == 401 and self.current_password:
+            with self._auth_lock:
+                # Another thread may have refreshed the token already
+                if response.request.headers.get('Authorization') == self.session.headers.get('Authorization'):
+                    self._authenticate(self.current_email, self.current_password, force=True)
+            response = send()
+        return response
+    
+    def check_messages(self, timeout=15, deadline=None):
         """Check for messages in current email"""
         if not self.auth_token:
             return []
         
+        # (email, etag, body digest, parsed list) from the last successful check
+        cached = self._inbox_cache
+        if cached and cached[0] != self.current_email:
+            cached = None
+        
         try:
-            response = self.session.get(f"{self.base_url}/messages", timeout=15)
+            headers = {'If-None-Match': cached[1]} if cached and cached[1] else None
+            response = self._get("/messages", timeout, headers, deadline)
+            if response.status_code == 304 and cached:
+                return list(cached[3])
             if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, dict) and 'hydra:member' in data:
-                    messages = data['hydra:member']
-                elif isinstance(data, list):
-                    messages = data
-                else:
-                    return []
+                # Unchanged inbox: skip parsing even when upstream sends no ETag
+                digest = hashlib.blake2b(response.content, digest_size=16).digest()
+                if cached and cached[2] == digest:
+                    return list(cached[3])
+                
+                messages = self._hydra_members(loads(response.content))
                 
                 result = []
                 for msg in messages:
@@ -227,21 +467,25 @@ class TempMailService:
                             'received_at': msg.get('createdAt', ''),
                             'preview': (msg.get('intro', '') or '')[:100]
                         })
-                return result
+                self._inbox_cache = (self.current_email, response.headers.get('ETag'), digest, result)
+                return list(result)
             return []
         except Exception as e:
             print(f"❌ Error checking messages: {e}")
             return []
     
-    def get_message_content(self, message_id):
+    def get_message_content(self, message_id, timeout=15, deadline=None):
         """Get full message content"""
         if not self.auth_token:
             return None
         
+        if message_id in self._content_cache:
+            return self._content_cache[message_id]
+        
         try:
-            response = self.session.get(f"{self.base_url}/messages/{message_id}", timeout=15)
+            response = self._get(f"/messages/{message_id}", timeout, deadline=deadline)
             if response.status_code == 200:
-                msg = response.json()
+                msg = loads(response.content)
                 from_info = msg.get('from', {})
                 from_addr = from_info.get('address', '') if isinstance(from_info, dict) else str(from_info)
                 
@@ -251,7 +495,7 @@ class TempMailService:
                 elif not isinstance(html_content, list):
                     html_content = []
                 
-                return {
+                content = {
                     'id': msg.get('id'),
                     'from': from_addr,
                     'subject': msg.get('subject', ''),
@@ -259,11 +503,28 @@ class TempMailService:
                     'text_content': msg.get('text', ''),
                     'received_at': msg.get('createdAt', '')
                 }
+                self._content_cache[message_id] = content
+                return content
             return None
         except Exception as e:
             print(f"❌ Error getting message: {e}")
             return None
     
+    def iter_message_contents(self, messages, timeout=15, deadline=None):
+        """Fetch contents concurrently, yielding (message, content) in inbox order.
+        
+        Newest first regardless of which fetch finishes first, so a wait
+        reports the newest matching message.
+        """
+        futures = [self._executor.submit(self.get_message_content, m['id'], timeout, deadline) for m in messages]
+        try:
+            for message, future in zip(messages, futures):
+                yield message, future.result()
+        finally:
+            # Caller stopped early (match found) - drop fetches not started yet
+            for future in futures:
+                future.cancel()
+    
     def extract_verification_code(self, content):
         """Extract verification code from message"""
         if not content:
@@ -273,53 +534,71 @@ class TempMailService:
         if not text:
             return None
         
-        patterns = [
-            r'(?:verification|verify|code|otp|pin)[:\s]+([A-Z0-9]{4,8})',
-            r'(?:code|otp|pin)\s*(?:is|:)\s*([A-Z0-9]{4,8})',
-            r'\b([0-9]{4,6})\b',
-            r'\b([A-Z0-9]{6})\b',
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                return matches[0]
+        for pattern in _CODE_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                return match.group(1)
         return None
     
+    def _iter_texts(self, content):
+        """Yield the text body and each HTML part separately (no big joined copy)"""
+        yield content.get('text_content', '') or ''
+        for part in content.get('html_content', []):
+            if isinstance(part, str):
+                yield part
+    
+    def _find_links(self, pattern, content):
+        """Collect unique pattern matches across all message parts"""
+        links = set()
+        for text in self._iter_texts(content):
+            links.update(m.group() for m in pattern.finditer(text))
+        return list(links)
+    
     def extract_verification_links(self, content):
         """Extract verification links from message"""
         if not content:
             return []
         
-        all_content = content.get('text_content', '')
-        for html_part in content.get('html_content', []):
-            if isinstance(html_part, str):
-                all_content += " " + html_part
-        
-        patterns = [
-            r'https?://[^\s<>"{}|\\^`\[\]]+(?:verify|confirm|activate|validation|auth)[^\s<>"{}|\\^`\[\]]*',
-            r'https?://[^\s<>"{}|\\^`\[\]]*(?:token|code|key)=[^\s<>"{}|\\^`\[\]]+',
-        ]
-        
-        links = []
-        for pattern in patterns:
-            matches = re.findall(pattern, all_content, re.IGNORECASE)
-            links.extend(matches)
-        return list(set(links))
+        return self._find_links(_VERIFY_LINK_PATTERN, content)
     
     def extract_all_links(self, content):
         """Extract all links from message"""
         if not content:
             return []
         
-        all_content = content.get('text_content', '')
-        for html_part in content.get('html_content', []):
-            if isinstance(html_part, str):
-                all_content += " " + html_part
+        return self._find_links(_ALL_LINKS_PATTERN, content)
+    
+    def extract_all(self, content):
+        """Extract code, verification links and all links in one link scan.
+        
+        Each part is scanned for links once; verification links are the
+        subset whose URL also matches the verification pattern.
+        """
+        if not content:
+            return {'verification_code': None, 'verification_links': [], 'all_links': []}
         
-        pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-        links = re.findall(pattern, all_content, re.IGNORECASE)
-        return list(set(links))
+        # Contents come from _content_cache, so the same object means the same body
+        cached = self._extract_cache.get(content.get('id'))
+        if cached and cached[0] is content:
+            return cached[1]
+        
+        all_links, verify_links = set(), set()
+        for text in self._iter_texts(content):
+            for match in _ALL_LINKS_PATTERN.finditer(text):
+                link = match.group()
+                all_links.add(link)
+                verify = _VERIFY_LINK_PATTERN.search(link)
+                if verify:
+                    verify_links.add(verify.group())
+        
+        result = {
+            'verification_code': self.extract_verification_code(content),
+            'verification_links': list(verify_links),
+            'all_links': list(all_links)
+        }
+        if content.get('id'):
+            self._extract_cache[content['id']] = (content, result)
+        return result
 
 # ============================================================================
 #                           SPINNER / ANIMATION
@@ -328,26 +607,27 @@ class TempMailService:
 class Spinner:
     def __init__(self, message="Waiting"):
         self.message = message
-        self.running = False
         self.start_time = None
         self.thread = None
+        self._stop_event = threading.Event()
     
     def spin(self):
         spinner_chars = itertools.cycle(['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏'])
-        while self.running:
+        # 4 Hz is smooth enough; wait() returns at once when stop() is called
+        while not self._stop_event.is_set():
             elapsed = int(time.time() - self.start_time)
             sys.stdout.write(f'\r{next(spinner_chars)} {self.message}... [{elapsed}s elapsed]   ')
             sys.stdout.flush()
-            time.sleep(0.1)
+            self._stop_event.wait(0.25)
     
     def start(self):
-        self.running = True
+        self._stop_event.clear()
         self.start_time = time.time()
-        self.thread = threading.Thread(target=self.spin)
+        self.thread = threading.Thread(target=self.spin, daemon=True)
         self.thread.start()
     
     def stop(self, clear=True):
-        self.running = False
+        self._stop_event.set()
         if self.thread:
             self.thread.join()
         if clear:
@@ -358,47 +638,155 @@ class Spinner:
 #                           WAIT FUNCTIONS
 # ============================================================================
 
-def wait_for_verification(service, wait_type='any', timeout=60):
+POLL_INTERVAL_MIN = 1.0   # First poll delay, restored whenever new mail arrives
+POLL_INTERVAL_MAX = 15.0  # Upper bound for the exponential backoff
+REQUEST_TIMEOUT = 15      # Default per-request timeout while waiting
+
+def _match_message(service, wait_type, msg, content):
+    """Return a wait result if the message satisfies wait_type"""
+    if wait_type == 'email':
+        return {'type': 'email', 'content': content, 'message': msg}
+    
+    code = service.extract_verification_code(content)
+    links = service.extract_verification_links(content)
+    
+    if wait_type in ('code', 'any') and code:
+        return {'type': 'code', 'value': code, 'message': msg}
+    if wait_type in ('link', 'any') and links:
+        return {'type': 'link', 'value': links[0], 'all_links': links, 'message': msg}
+    return None
+
+def _request_timeout(deadline):
+    """Per-request timeout that never runs past the overall wait deadline"""
+    return max(0.1, min(REQUEST_TIMEOUT, deadline - time.time()))
+
+def _scan_new_messages(service, wait_type, seen_ids, deadline):
+    """Check unseen messages once; returns (result, found_new_messages)"""
+    messages = service.check_messages(deadline=deadline)
+    new_messages = [m for m in messages if m['id'] not in seen_ids]
+    if not new_messages or time.time() >= deadline:
+        return None, bool(new_messages)
+    for msg, content in service.iter_message_contents(new_messages, deadline=deadline):
+        if not content:
+            continue  # Retry on the next check
+        seen_ids.add(msg['id'])
+        result = _match_message(service, wait_type, msg, content)
+        if result:
+            return result, True
+    return None, bool(new_messages)
+
+def wait_for_verification(service, wait_type='any', timeout=60, seen_ids=None):
     """Wait for verification code/link with spinner"""
     spinner = Spinner(f"Waiting for {wait_type}")
     spinner.start()
     
-    start_time = time.time()
-    initial_count = len(service.check_messages())
+    deadline = time.time() + timeout
+    # Messages already in the inbox are not what we're waiting for
+    if seen_ids is None:
+        seen_ids = {m['id'] for m in service.check_messages(deadline=deadline)}
+    interval = POLL_INTERVAL_MIN
     
     try:
-        while time.time() - start_time < timeout:
-            messages = service.check_messages()
+        while time.time() < deadline:
+            result, found_new = _scan_new_messages(service, wait_type, seen_ids, deadline)
+            if result:
+                return result
             
-            for msg in messages:
-                content = service.get_message_content(msg['id'])
-                if content:
-                    code = service.extract_verification_code(content)
-                    links = service.extract_verification_links(content)
-                    
-                    if wait_type == 'code' and code:
-                        spinner.stop()
-                        return {'type': 'code', 'value': code, 'message': msg}
-                    elif wait_type == 'link' and links:
-                        spinner.stop()
-                        return {'type': 'link', 'value': links[0], 'all_links': links, 'message': msg}
-                    elif wait_type == 'any':
-                        if code:
-                            spinner.stop()
-                            return {'type': 'code', 'value': code, 'message': msg}
-                        if links:
-                            spinner.stop()
-                            return {'type': 'link', 'value': links[0], 'all_links': links, 'message': msg}
-                    elif wait_type == 'email' and len(messages) > initial_count:
-                        spinner.stop()
-                        return {'type': 'email', 'content': content, 'message': msg}
+            # Back off while the inbox is idle, poll quickly again once mail shows up
+            if found_new:
+                interval = POLL_INTERVAL_MIN
+            else:
+                interval = min(interval * 2, POLL_INTERVAL_MAX)
             
-            time.sleep(2)
+            # Spinner redraws on its own thread, so only the poll cadence lives here
+            time.sleep(max(0, min(interval, deadline - time.time())))
     finally:
         spinner.stop()
     
     return None
 
+def _shut_at(response, deadline):
+    """Shut a streamed response's socket down at deadline; returns the started timer.
+    
+    Every heartbeat resets the read timeout, so only this bounds a read
+    that is still blocked when the deadline passes.
+    """
+    def shut():
+        sock = getattr(getattr(response.raw, '_connection', None), 'sock', None)
+        try:
+            if sock is None:
+                # Connection: close responses hand the socket to http.client's reader
+                sock = response.raw._fp.fp.raw._sock
+            sock.shutdown(socket.SHUT_RDWR)  # Wakes the blocked read with EOF
+        except (AttributeError, OSError):
+            pass
+    timer = threading.Timer(max(0, deadline - time.time()), shut)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+def wait_for_verification_sse(service, wait_type='any', timeout=60):
+    """Wait for verification using mail.tm's Mercure push stream.
+    
+    The inbox is only re-checked when the server announces an update.
+    Falls back to polling if the stream can't be opened or breaks.
+    """
+    if not service.account_id:
+        return wait_for_verification(service, wait_type, timeout)
+    
+    deadline = time.time() + timeout
+    seen_ids = {m['id'] for m in service.check_messages(deadline=deadline)}
+    
+    spinner = Spinner(f"Waiting for {wait_type}")
+    spinner.start()
+    try:
+        # Read timeout = remaining budget, so a silent stream can't outlive the wait
+        remaining = max(0.1, deadline - time.time())
+        with service._wait_session.get(
+            service.mercure_url,
+            params={'topic': f'/accounts/{service.account_id}'},
+            headers={'Accept': 'text/event-stream'},
+            stream=True,
+            timeout=(min(10, remaining), remaining)
+        ) as response:
+            if response.status_code != 200:
+                raise requests.exceptions.RequestException(f"stream returned {response.status_code}")
+            
+            # Mail that landed while the stream was opening was never announced
+            result, _ = _scan_new_messages(service, wait_type, seen_ids, deadline)
+            if result:
+                return result
+            
+            # Heartbeats keep the socket busy, so the deadline is enforced from a timer
+            shutdown = _shut_at(response, deadline)
+            try:
+                has_data = False
+                # chunk_size=1: the default 512-byte reads would sit on small heartbeats and
+                # events until enough bytes pile up on a stream without chunked encoding
+                for line in response.iter_lines(chunk_size=1, decode_unicode=True):
+                    if time.time() >= deadline:
+                        return None
+                    if line and line.startswith('data:'):
+                        has_data = True
+                    elif not line and has_data:
+                        # End of event - any message/account update means new mail may be there
+                        has_data = False
+                        result, _ = _scan_new_messages(service, wait_type, seen_ids, deadline)
+                        if result:
+                            return result
+            finally:
+                shutdown.cancel()
+    except requests.exceptions.RequestException:
+        pass
+    finally:
+        spinner.stop()
+    
+    # Stream unavailable or closed by the server: poll for whatever time is left
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        return None
+    return wait_for_verification(service, wait_type, remaining, seen_ids)
+
 # ============================================================================
 #                           MENU FUNCTIONS
 # ============================================================================
@@ -541,7 +929,7 @@ def main():
                 else:
                     timeout = get_timeout()
                     print(f"\n⏳ Waiting for verification code (max {timeout}s)...\n")
-                    result = wait_for_verification(service, 'code', timeout)
+                    result = wait_for_verification_sse(service, 'code', timeout)
                     if result:
                         print(f"\n✅ Code received: {result['value']}")
                         if copy_to_clipboard(result['value']):
@@ -557,7 +945,7 @@ def main():
                 else:
                     timeout = get_timeout()
                     print(f"\n🔗 Waiting for verification link (max {timeout}s)...\n")
-                    result = wait_for_verification(service, 'link', timeout)
+                    result = wait_for_verification_sse(service, 'link', timeout)
                     if result:
                         print(f"\n✅ Link received: {result['value']}")
                         if copy_to_clipboard(result['value']):
@@ -573,7 +961,7 @@ def main():
                 else:
                     timeout = get_timeout()
                     print(f"\n🎯 Waiting for any verification (max {timeout}s)...\n")
-                    result = wait_for_verification(service, 'any', timeout)
+                    result = wait_for_verification_sse(service, 'any', timeout)
                     if result:
                         print(f"\n✅ {result['type'].upper()} received: {result['value']}")
                         if copy_to_clipboard(result['value']):
@@ -592,7 +980,7 @@ def main():
                 else:
                     timeout = get_timeout()
                     print(f"\n📬 Waiting for new email (max {timeout}s)...\n")
-                    result = wait_for_verification(service, 'email', timeout)
+                    result = wait_for_verification_sse(service, 'email', timeout)
                     if result:
                         print(f"\n✅ New email received!")
                         print(f"   From: {result['message'].get('from', 'Unknown')}")
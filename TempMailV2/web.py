@@ -8,15 +8,109 @@ Open: http://localhost:5000
 
 import sys
 import os
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 # Add current directory to path to import from main.py
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, render_template, jsonify, request
-from main import TempMailService, load_history, add_to_history
+from flask import Flask, Response, render_template, request
+from main import TempMailService, HISTORY_FILE, load_history, add_to_history, dumps
 
 app = Flask(__name__)
+
+# Compress larger JSON/HTML responses when flask-compress is installed.
+# Streams stay uncompressed so SSE events are flushed as they are written.
+try:
+    from flask_compress import Compress
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    app.config['COMPRESS_STREAMS'] = False
+    Compress(app)
+except ImportError:
+    pass
+
 service = TempMailService()
+_pool = ThreadPoolExecutor(max_workers=8)  # Parallel message-content fetches
+
+def _json_response(obj):
+    """JSON response serialized with main.dumps (orjson when installed)"""
+    return Response(dumps(obj), mimetype='application/json')
+
+# ============================================================================
+#                           SHARED INBOX POLLER
+# ============================================================================
+
+POLL_INTERVAL = 2        # Seconds between upstream checks while someone is waiting
+STREAM_HEARTBEAT = 15    # Seconds between SSE keep-alive comments
+WAIT_TIMEOUT_MAX = 300   # Longest a wait may hold a server thread
+
+# One background thread polls mail.tm on behalf of every waiting request and
+# bumps a per-email generation counter when new mail shows up; waiters sleep
+# on the condition instead of each polling upstream themselves.
+_mail_cond = threading.Condition()
+_mail_generation = {}  # email -> number of times new mail was seen
+_active_waiters = 0
+_poller_thread = None
+
+def _poller():
+    """Poll the current inbox while at least one request is waiting"""
+    known_ids = {}
+    while True:
+        with _mail_cond:
+            while _active_waiters == 0:
+                _mail_cond.wait()
+        
+        email = service.current_email
+        if email:
+            ids = {m['id'] for m in service.check_messages()}
+            # First poll for an email also notifies, covering mail that landed
+            # between a waiter's own scan and the poller picking the inbox up
+            previous = known_ids.get(email)
+            known_ids[email] = ids
+            if previous is None or ids - previous:
+                with _mail_cond:
+                    _mail_generation[email] = _mail_generation.get(email, 0) + 1
+                    _mail_cond.notify_all()
+        time.sleep(POLL_INTERVAL)
+
+def _ensure_poller():
+    global _poller_thread
+    with _mail_cond:
+        if _poller_thread is None:
+            _poller_thread = threading.Thread(target=_poller, daemon=True)
+            _poller_thread.start()
+
+@contextmanager
+def _waiting():
+    """Keep the poller running for the duration of the block"""
+    global _active_waiters
+    _ensure_poller()
+    with _mail_cond:
+        _active_waiters += 1
+        _mail_cond.notify_all()
+    try:
+        yield
+    finally:
+        with _mail_cond:
+            _active_waiters -= 1
+
+def _current_generation(email):
+    with _mail_cond:
+        return _mail_generation.get(email, 0)
+
+def _wait_new_mail(email, generation, timeout):
+    """Block until the poller reports mail newer than generation.
+    
+    Returns the new generation, or None on timeout.
+    """
+    with _mail_cond:
+        if _mail_cond.wait_for(lambda: _mail_generation.get(email, 0) != generation,
+                               timeout=max(0, timeout)):
+            return _mail_generation.get(email, 0)
+    return None
 
 # ============================================================================
 #                           API ENDPOINTS
@@ -32,8 +126,8 @@ def generate_email():
     """Generate new temporary email"""
     result = service.generate_email()
     if result:
-        return jsonify({'success': True, 'email': result['email']})
-    return jsonify({'success': False, 'error': 'Failed to generate email'}), 500
+        return _json_response({'success': True, 'email': result['email']})
+    return _json_response({'success': False, 'error': 'Failed to generate email'}), 500
 
 @app.route('/api/login', methods=['POST'])
 def login_email():
@@ -43,17 +137,17 @@ def login_email():
     password = data.get('password')
     
     if not email or not password:
-        return jsonify({'success': False, 'error': 'Email and password required'}), 400
+        return _json_response({'success': False, 'error': 'Email and password required'}), 400
     
     result = service.login(email, password)
     if result:
-        return jsonify({'success': True, 'email': result['email']})
-    return jsonify({'success': False, 'error': 'Login failed'}), 401
+        return _json_response({'success': True, 'email': result['email']})
+    return _json_response({'success': False, 'error': 'Login failed'}), 401
 
 @app.route('/api/status')
 def get_status():
     """Get current status"""
-    return jsonify({
+    return _json_response({
         'success': True,
         'email': service.current_email,
         'authenticated': bool(service.auth_token)
@@ -63,98 +157,206 @@ def get_status():
 def get_messages():
     """Get all messages"""
     if not service.current_email:
-        return jsonify({'success': False, 'error': 'No active email'}), 400
+        return _json_response({'success': False, 'error': 'No active email'}), 400
     
     messages = service.check_messages()
-    return jsonify({'success': True, 'messages': messages})
+    return _json_response({'success': True, 'messages': messages})
 
 @app.route('/api/message/<message_id>')
 def get_message(message_id):
     """Get specific message content"""
     if not service.current_email:
-        return jsonify({'success': False, 'error': 'No active email'}), 400
+        return _json_response({'success': False, 'error': 'No active email'}), 400
     
     content = service.get_message_content(message_id)
     if content:
-        code = service.extract_verification_code(content)
-        links = service.extract_verification_links(content)
-        all_links = service.extract_all_links(content)
+        extracted = service.extract_all(content)
         
-        return jsonify({
+        return _json_response({
             'success': True,
             'content': content,
-            'code': code,
-            'verification_links': links,
-            'all_links': all_links
+            'code': extracted['verification_code'],
+            'verification_links': extracted['verification_links'],
+            'all_links': extracted['all_links']
         })
-    return jsonify({'success': False, 'error': 'Message not found'}), 404
+    return _json_response({'success': False, 'error': 'Message not found'}), 404
+
+# Serialized /api/history body, reused until the history file changes
+_history_response = {'mtime': None, 'body': None}
 
 @app.route('/api/history')
 def get_history():
     """Get email history"""
-    history = load_history()
-    # Return without passwords for security in UI
-    sessions = []
-    for s in history.get('sessions', []):
-        sessions.append({
+    try:
+        mtime = os.stat(HISTORY_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+    
+    if _history_response['body'] is None or _history_response['mtime'] != mtime:
+        history = load_history()
+        # Return without tokens; password is needed for re-login
+        sessions = [{
             'email': s['email'],
-            'password': s['password'],  # Needed for re-login
+            'password': s['password'],
             'created_at': s.get('created_at', ''),
             'codes_received': s.get('codes_received', []),
             'links_received': s.get('links_received', [])
-        })
-    return jsonify({'success': True, 'sessions': sessions})
-
-@app.route('/api/wait/<wait_type>', methods=['POST'])
-def wait_for(wait_type):
-    """Wait for verification (code/link/any/email)"""
-    if not service.current_email:
-        return jsonify({'success': False, 'error': 'No active email'}), 400
+        } for s in history.get('sessions', [])]
+        _history_response['body'] = dumps({'success': True, 'sessions': sessions})
+        _history_response['mtime'] = mtime
     
-    data = request.json or {}
-    timeout = data.get('timeout', 60)
+    return Response(_history_response['body'], mimetype='application/json')
+
+_WAIT_TYPES = frozenset(('code', 'link', 'any', 'email'))
+
+def _find_verification(wait_type, seen_ids=None):
+    """Scan the inbox once; returns a response payload or None.
     
-    # Check messages and look for verification
+    With seen_ids, messages already in the set are skipped and every
+    message scanned is added to it.
+    """
     messages = service.check_messages()
+    if seen_ids is not None:
+        messages = [m for m in messages if m['id'] not in seen_ids]
+    # Fetch all bodies at once; map() keeps inbox order (newest first)
+    contents = _pool.map(service.get_message_content, [m['id'] for m in messages])
     
-    for msg in messages:
-        content = service.get_message_content(msg['id'])
+    for msg, content in zip(messages, contents):
         if content:
-            code = service.extract_verification_code(content)
-            links = service.extract_verification_links(content)
+            if seen_ids is not None:
+                seen_ids.add(msg['id'])
+            extracted = service.extract_all(content)  # Cached per message id
+            code = extracted['verification_code']
+            links = extracted['verification_links']
             
             if wait_type == 'code' and code:
                 add_to_history(service.current_email, service.current_password, codes=[code])
-                return jsonify({'success': True, 'type': 'code', 'value': code, 'message': msg})
+                return {'success': True, 'type': 'code', 'value': code, 'message': msg}
             
             if wait_type == 'link' and links:
                 add_to_history(service.current_email, service.current_password, links=links)
-                return jsonify({'success': True, 'type': 'link', 'value': links[0], 'all_links': links, 'message': msg})
+                return {'success': True, 'type': 'link', 'value': links[0], 'all_links': links, 'message': msg}
             
             if wait_type == 'any':
                 if code:
                     add_to_history(service.current_email, service.current_password, codes=[code])
-                    return jsonify({'success': True, 'type': 'code', 'value': code, 'message': msg})
+                    return {'success': True, 'type': 'code', 'value': code, 'message': msg}
                 if links:
                     add_to_history(service.current_email, service.current_password, links=links)
-                    return jsonify({'success': True, 'type': 'link', 'value': links[0], 'all_links': links, 'message': msg})
+                    return {'success': True, 'type': 'link', 'value': links[0], 'all_links': links, 'message': msg}
             
             if wait_type == 'email':
-                return jsonify({'success': True, 'type': 'email', 'content': content, 'message': msg})
+                return {'success': True, 'type': 'email', 'content': content, 'message': msg}
+    return None
+
+def _wait_timeout(value):
+    """Client timeout as seconds clamped to [0, WAIT_TIMEOUT_MAX], or None if invalid"""
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return None
+    if timeout != timeout:  # NaN
+        return None
+    return min(max(timeout, 0), WAIT_TIMEOUT_MAX)
+
+@app.route('/api/wait/<wait_type>', methods=['POST'])
+def wait_for(wait_type):
+    """Wait for verification (code/link/any/email)"""
+    if wait_type not in _WAIT_TYPES:
+        return _json_response({'success': False, 'error': f'Unknown wait type: {wait_type}'}), 400
+    
+    if not service.current_email:
+        return _json_response({'success': False, 'error': 'No active email'}), 400
+    
+    data = request.json or {}
+    timeout = _wait_timeout(data.get('timeout', 60))
+    if timeout is None:
+        return _json_response({'success': False, 'error': 'timeout must be a number of seconds'}), 400
+    email = service.current_email
+    
+    generation = _current_generation(email)
+    seen_ids = set()  # Later polls only extract messages that arrived since
+    result = _find_verification(wait_type, seen_ids)
+    if result:
+        return _json_response(result)
+    
+    # Nothing yet - block until the shared poller reports new mail or we time out
+    deadline = time.time() + timeout
+    with _waiting():
+        while service.current_email == email:
+            generation = _wait_new_mail(email, generation, deadline - time.time())
+            if generation is None:
+                break
+            result = _find_verification(wait_type, seen_ids)
+            if result:
+                return _json_response(result)
+    
+    return _json_response({'success': False, 'found': False, 'message': 'No verification found yet'})
+
+def _sse(payload, event=None):
+    """Format one Server-Sent Event"""
+    prefix = f"event: {event}\n" if event else ''
+    return f"{prefix}data: {dumps(payload).decode('utf-8')}\n\n"
+
+@app.route('/api/stream/<wait_type>')
+def stream_for(wait_type):
+    """Stream a single event when a verification (code/link/any/email) arrives"""
+    if wait_type not in _WAIT_TYPES:
+        return _json_response({'success': False, 'error': f'Unknown wait type: {wait_type}'}), 400
+    
+    if not service.current_email:
+        return _json_response({'success': False, 'error': 'No active email'}), 400
+    
+    timeout = _wait_timeout(request.args.get('timeout', 60))
+    if timeout is None:
+        return _json_response({'success': False, 'error': 'timeout must be a number of seconds'}), 400
+    email = service.current_email
+    
+    def generate():
+        deadline = time.time() + timeout
+        seen_ids = set()  # Only messages new since the last scan get extracted
+        generation = _current_generation(email)
+        with _waiting():
+            while True:
+                result = _find_verification(wait_type, seen_ids)
+                if result:
+                    yield _sse(result)
+                    return
+                
+                while True:
+                    remaining = deadline - time.time()
+                    if remaining <= 0 or service.current_email != email:
+                        yield _sse({'success': False, 'found': False, 'message': 'No verification found yet'},
+                                   event='timeout')
+                        return
+                    new_generation = _wait_new_mail(email, generation, min(remaining, STREAM_HEARTBEAT))
+                    if new_generation is not None:
+                        generation = new_generation
+                        break
+                    yield ": keep-alive\n\n"
     
-    return jsonify({'success': False, 'found': False, 'message': 'No verification found yet'})
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # ============================================================================
 #                           MAIN
 # ============================================================================
 
 if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5000))
     print("=" * 50)
     print("  📧 TempMail Web UI")
     print("=" * 50)
     print()
-    print("  Open in browser: http://localhost:5000")
+    print(f"  Open in browser: http://localhost:{port}")
     print()
     print("  Press Ctrl+C to stop")
     print("=" * 50)
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Prefer a multi-threaded production server; the Flask dev server is the fallback
+    try:
+        from waitress import serve
+        serve(app, host='0.0.0.0', port=port, threads=int(os.environ.get('THREADS', 8)))
+    except ImportError:
+        # Reloader off: it forks a watcher process; DEBUG=1 opts back into the debugger
+        app.run(host='0.0.0.0', port=port, debug=os.environ.get('DEBUG') == '1',
+                use_reloader=False, threaded=True)
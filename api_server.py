@@ -10,10 +10,28 @@ Endpoints:
 - POST /wait-code   - Wait for verification code
 """
 
-from flask import Flask, jsonify, request
+import os
+import time
+import threading
+from flask import Flask, Response, request
 from tempmail_service import TempMailService
+from jsonutil import dumps
 
 app = Flask(__name__)
+
+# Compress larger JSON/HTML responses when flask-compress is installed.
+try:
+    from flask_compress import Compress
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    Compress(app)
+except ImportError:
+    pass
+
+def _json_response(obj):
+    """JSON response serialized with orjson when installed"""
+    return Response(dumps(obj), mimetype='application/json')
+
 temp_mail = TempMailService()
 
 @app.route('/generate', methods=['GET'])
@@ -21,12 +39,12 @@ def generate_email():
     """Generate a new temporary email address"""
     result = temp_mail.generate_email()
     if result:
-        return jsonify({
+        return _json_response({
             'success': True,
             'data': result
         })
     else:
-        return jsonify({
+        return _json_response({
             'success': False,
             'error': 'Failed to generate email'
         }), 500
@@ -35,13 +53,13 @@ def generate_email():
 def get_messages():
     """Get all messages for current email"""
     if not temp_mail.current_email:
-        return jsonify({
+        return _json_response({
             'success': False,
             'error': 'No active email. Generate an email first.'
         }), 400
     
     messages = temp_mail.check_messages()
-    return jsonify({
+    return _json_response({
         'success': True,
         'email': temp_mail.current_email,
         'count': len(messages),
@@ -52,7 +70,7 @@ def get_messages():
 def get_message(message_id):
     """Get specific message content with full parsing"""
     if not temp_mail.current_email:
-        return jsonify({
+        return _json_response({
             'success': False,
             'error': 'No active email. Generate an email first.'
         }), 400
@@ -62,7 +80,7 @@ def get_message(message_id):
         # Parse all content
         parsed = temp_mail.parse_message_content(content)
         
-        return jsonify({
+        return _json_response({
             'success': True,
             'data': {
                 'raw_content': content,
@@ -70,155 +88,136 @@ def get_message(message_id):
             }
         })
     else:
-        return jsonify({
+        return _json_response({
             'success': False,
             'error': 'Message not found'
         }), 404
 
-@app.route('/wait-code', methods=['POST'])
-def wait_for_code():
-    """Wait for verification code in new messages"""
-    if not temp_mail.current_email:
-        return jsonify({
-            'success': False,
-            'error': 'No active email. Generate an email first.'
-        }), 400
-    
-    # Get timeout from request (default 60 seconds)
-    timeout = request.json.get('timeout', 60) if request.is_json else 60
-    
-    result = temp_mail.wait_for_verification_code(timeout)
-    if result:
-        return jsonify({
-            'success': True,
-            'data': result
-        })
-    else:
-        return jsonify({
-            'success': False,
-            'error': 'No verification code received within timeout period'
-        }), 408
-
-@app.route('/wait-link', methods=['POST'])
-def wait_for_link():
-    """Wait for verification link in new messages"""
-    if not temp_mail.current_email:
-        return jsonify({
-            'success': False,
-            'error': 'No active email. Generate an email first.'
-        }), 400
-    
-    timeout = request.json.get('timeout', 60) if request.is_json else 60
-    
-    result = temp_mail.wait_for_verification_link(timeout)
-    if result:
-        return jsonify({
-            'success': True,
-            'data': result
-        })
-    else:
-        return jsonify({
-            'success': False,
-            'error': 'No verification link received within timeout period'
-        }), 408
+# wait-<kind> endpoint -> (service method, error when nothing arrives)
+_WAITERS = {
+    'code': (temp_mail.wait_for_verification_code, 'No verification code received within timeout period'),
+    'link': (temp_mail.wait_for_verification_link, 'No verification link received within timeout period'),
+    'any': (temp_mail.wait_for_any_verification, 'No verification received within timeout period'),
+    'email': (temp_mail.wait_for_new_email, 'No new email received within timeout period'),
+}
 
-@app.route('/wait-any', methods=['POST'])
-def wait_for_any():
-    """Wait for any type of verification (code or link)"""
-    if not temp_mail.current_email:
-        return jsonify({
+@app.route('/wait-<kind>', methods=['POST'])
+def wait_for(kind):
+    """Wait for a verification code, link, either one, or any new email"""
+    waiter = _WAITERS.get(kind)
+    if waiter is None:
+        return _json_response({
             'success': False,
-            'error': 'No active email. Generate an email first.'
-        }), 400
-    
-    timeout = request.json.get('timeout', 60) if request.is_json else 60
+            'error': f'Unknown wait type: {kind}'
+        }), 404
     
-    result = temp_mail.wait_for_any_verification(timeout)
-    if result:
-        return jsonify({
-            'success': True,
-            'data': result
-        })
-    else:
-        return jsonify({
-            'success': False,
-            'error': 'No verification received within timeout period'
-        }), 408
-
-@app.route('/wait-email', methods=['POST'])
-def wait_for_email():
-    """Wait for any new email"""
     if not temp_mail.current_email:
-        return jsonify({
+        return _json_response({
             'success': False,
             'error': 'No active email. Generate an email first.'
         }), 400
     
+    # Get timeout from request (default 60 seconds)
     timeout = request.json.get('timeout', 60) if request.is_json else 60
     
-    result = temp_mail.wait_for_new_email(timeout)
+    wait_fn, error = waiter
+    result = wait_fn(timeout)
     if result:
-        return jsonify({
+        return _json_response({
             'success': True,
             'data': result
         })
     else:
-        return jsonify({
+        return _json_response({
             'success': False,
-            'error': 'No new email received within timeout period'
+            'error': error
         }), 408
 
 @app.route('/status', methods=['GET'])
 def get_status():
     """Get service status"""
     status = temp_mail.get_status()
-    return jsonify({
+    return _json_response({
         'success': True,
         'data': status
     })
 
+DOMAINS_TTL = 60  # Seconds a serialized /domains body is reused
+
+# Serialized /domains body and the TTL bucket it was built in
+_domains_response = {'bucket': None, 'body': None}
+
 @app.route('/domains', methods=['GET'])
 def get_domains():
     """Get available email domains"""
-    domains = temp_mail.get_available_domains()
-    return jsonify({
-        'success': True,
-        'count': len(domains),
-        'data': domains
-    })
+    bucket = int(time.time()) // DOMAINS_TTL
+    if _domains_response['bucket'] != bucket:
+        domains = temp_mail.get_available_domains()
+        body = dumps({
+            'success': True,
+            'count': len(domains),
+            'data': domains
+        })
+        if not domains:
+            # Don't pin a failed lookup for the whole TTL
+            return Response(body, mimetype='application/json')
+        _domains_response['body'] = body
+        _domains_response['bucket'] = bucket
+    
+    return Response(_domains_response['body'], mimetype='application/json')
+
+# API documentation never changes, so serialize it once
+_INDEX_BODY = dumps({
+    'service': 'TempMail API',
+    'version': '2.0.0',
+    'endpoints': {
+        'GET /generate': 'Generate new temporary email',
+        'GET /messages': 'Get all messages for current email',
+        'GET /message/{id}': 'Get specific message with full parsing',
+        'POST /wait-code': 'Wait for verification code (JSON: {"timeout": 60})',
+        'POST /wait-link': 'Wait for verification link (JSON: {"timeout": 60})',
+        'POST /wait-any': 'Wait for any verification (code or link)',
+        'POST /wait-email': 'Wait for any new email',
+        'GET /status': 'Get service status',
+        'GET /domains': 'Get available email domains'
+    },
+    'features': {
+        'verification_codes': 'Extract 4-8 digit codes automatically',
+        'verification_links': 'Extract confirmation/activation links',
+        'all_links': 'Extract all HTTP/HTTPS links from emails',
+        'email_addresses': 'Extract email addresses from content',
+        'full_parsing': 'Complete content analysis and extraction'
+    },
+    'usage_examples': {
+        '1_generate': 'GET /generate - to create email',
+        '2_wait_any': 'POST /wait-any - to wait for code OR link',
+        '3_wait_specific': 'POST /wait-code or /wait-link - for specific type',
+        '4_check_messages': 'GET /messages - to check all messages',
+        '5_new_email': 'POST /wait-email - to wait for any new email'
+    }
+})
 
 @app.route('/', methods=['GET'])
 def index():
     """API documentation"""
-    return jsonify({
-        'service': 'TempMail API',
-        'version': '2.0.0',
-        'endpoints': {
-            'GET /generate': 'Generate new temporary email',
-            'GET /messages': 'Get all messages for current email',
-            'GET /message/{id}': 'Get specific message with full parsing',
-            'POST /wait-code': 'Wait for verification code (JSON: {"timeout": 60})',
-            'POST /wait-link': 'Wait for verification link (JSON: {"timeout": 60})',
-            'POST /wait-any': 'Wait for any verification (code or link)',
-            'POST /wait-email': 'Wait for any new email',
-            'GET /status': 'Get service status',
-            'GET /domains': 'Get available email domains'
-        },
-        'features': {
-            'verification_codes': 'Extract 4-8 digit codes automatically',
-            'verification_links': 'Extract confirmation/activation links',
-            'all_links': 'Extract all HTTP/HTTPS links from emails',
-            'email_addresses': 'Extract email addresses from content',
-            'full_parsing': 'Complete content analysis and extraction'
-        },
-        'usage_examples': {
-            '1_generate': 'GET /generate - to create email',
-            '2_wait_any': 'POST /wait-any - to wait for code OR link',
-            '3_wait_specific': 'POST /wait-code or /wait-link - for specific type',
-            '4_check_messages': 'GET /messages - to check all messages',
-            '5_new_email': 'POST /wait-email - to wait for any new email'
-        }
-    })
+    return Response(_INDEX_BODY, mimetype='application/json')
+
+def warm_up():
+    """Warm the upstream connection in the background so the first /generate skips the handshake"""
+    threading.Thread(target=temp_mail.warm_up, daemon=True).start()
+
+def serve(port=3001):
+    """Run the API on waitress when installed, else the Flask dev server"""
+    warm_up()
+    # Prefer a multi-threaded production server; the Flask dev server is the fallback
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        # Reloader off: it forks a watcher process; DEBUG=1 opts back into the debugger
+        app.run(host='0.0.0.0', port=port, debug=os.environ.get('DEBUG') == '1',
+                use_reloader=False, threaded=True)
+    else:
+        waitress_serve(app, host='0.0.0.0', port=port, threads=int(os.environ.get('THREADS', 8)))
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=3001, debug=True)
\ No newline at end of file
+    serve(int(os.environ.get('PORT', 3001)))
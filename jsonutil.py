@@ -0,0 +1,24 @@
+"""
+JSON helpers shared by the service, API server and CLIs
+Uses orjson when it is installed, otherwise the standard json module
+"""
+
+import json
+
+try:
+    import orjson
+    loads = orjson.loads
+    dumps = orjson.dumps
+
+    def print_json(data):
+        """Pretty print JSON data"""
+        print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8'))
+except ImportError:
+    loads = json.loads
+
+    def dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def print_json(data):
+        """Pretty print JSON data"""
+        print(json.dumps(data, indent=2))
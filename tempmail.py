@@ -5,21 +5,19 @@ Simple script that combines CLI and API server functionality
 """
 
 import sys
-import json
+import argparse
 import threading
 import time
-from tempmail_service import TempMailService
 
-def print_json(data):
-    """Pretty print JSON data"""
-    print(json.dumps(data, indent=2))
+from jsonutil import print_json
 
-def run_interactive_mode():
+def run_interactive_mode(poll_interval=2.0):
     """Interactive mode for easy testing"""
     print("🔥 TempMail Interactive Mode")
     print("=" * 40)
     
-    service = TempMailService()
+    from tempmail_service import TempMailService
+    service = TempMailService(poll_interval=poll_interval)
     
     while True:
         print("\n📋 What would you like to do?")
@@ -144,6 +142,7 @@ def quick_test():
     print("🧪 Quick TempMail Test")
     print("=" * 30)
     
+    from tempmail_service import TempMailService
     service = TempMailService()
     
     # Generate email
@@ -168,48 +167,69 @@ def quick_test():
     else:
         print("❌ Failed to generate email")
 
+def _usage():
+    print("TempMail All-in-One Tool")
+    print("\nUsage:")
+    print("  python tempmail.py test         - Quick test")
+    print("  python tempmail.py interactive  - Interactive mode")
+    print("  python tempmail.py server [port] - Start API server") 
+    print("  python tempmail.py generate     - Generate email and exit")
+    print("\n💡 Recommended: Start with 'python tempmail.py interactive'")
+
+def _cmd_test(args):
+    quick_test()
+
+def _cmd_interactive(args):
+    run_interactive_mode(args.poll_interval)
+
+def _cmd_server(args):
+    print(f"🚀 Starting TempMail API server on port {args.port}...")
+    
+    # Import and start server
+    from api_server import serve
+    try:
+        serve(args.port)
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
+
+def _cmd_generate(args):
+    from tempmail_service import TempMailService
+    service = TempMailService()
+    result = service.generate_email()
+    if result:
+        print(f"Email: {result['email']}")
+        print(f"Password: {result['password']}")
+    else:
+        print("Failed to generate email")
+
+HANDLERS = {
+    'test': _cmd_test,
+    'interactive': _cmd_interactive,
+    'server': _cmd_server,
+    'generate': _cmd_generate,
+}
+
+def _build_parser():
+    parser = argparse.ArgumentParser(prog='tempmail.py', description='TempMail All-in-One Tool')
+    sub = parser.add_subparsers(dest='cmd')
+    sub.add_parser('test', help='Quick test')
+    interactive = sub.add_parser('interactive', help='Interactive mode')
+    interactive.add_argument('--poll-interval', type=float, default=2.0,
+                             help='Initial seconds between inbox checks while waiting (default 2.0)')
+    server = sub.add_parser('server', help='Start API server')
+    server.add_argument('port', nargs='?', type=int, default=3001, help='Port to listen on (default 3001)')
+    sub.add_parser('generate', help='Generate email and exit')
+    return parser
+
 def main():
     if len(sys.argv) < 2:
-        print("TempMail All-in-One Tool")
-        print("\nUsage:")
-        print("  python tempmail.py test         - Quick test")
-        print("  python tempmail.py interactive  - Interactive mode")
-        print("  python tempmail.py server [port] - Start API server") 
-        print("  python tempmail.py generate     - Generate email and exit")
-        print("\n💡 Recommended: Start with 'python tempmail.py interactive'")
+        _usage()
         return
     
-    command = sys.argv[1].lower()
-    
-    if command == 'test':
-        quick_test()
-    
-    elif command == 'interactive':
-        run_interactive_mode()
-    
-    elif command == 'server':
-        port = int(sys.argv[2]) if len(sys.argv) > 2 else 3001
-        print(f"🚀 Starting TempMail API server on port {port}...")
-        
-        # Import and start server
-        from api_server import app
-        try:
-            app.run(host='0.0.0.0', port=port, debug=False)
-        except KeyboardInterrupt:
-            print("\n👋 Server stopped")
-    
-    elif command == 'generate':
-        service = TempMailService()
-        result = service.generate_email()
-        if result:
-            print(f"Email: {result['email']}")
-            print(f"Password: {result['password']}")
-        else:
-            print("Failed to generate email")
-    
-    else:
-        print(f"Unknown command: {command}")
-        print("Use 'python tempmail.py' to see available commands")
+    # Subcommands are matched case-insensitively, as before
+    argv = [sys.argv[1].lower()] + sys.argv[2:]
+    args = _build_parser().parse_args(argv)
+    HANDLERS[args.cmd](args)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -10,19 +10,161 @@ Features:
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
-import json
+import hashlib
 import random
-import string
+import secrets
+import socket
+import threading
+import re
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 from datetime import datetime
+from jsonutil import loads
+
+# Link/email patterns run on google-re2 when installed (linear-time DFA, no
+# backtracking blowups on long URLs); inline (?i) keeps them portable across both
+try:
+    import re2 as _link_re
+except ImportError:
+    _link_re = re
+
+# selectolax (optional) reduces HTML parts to visible text plus hrefs before scanning
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+CONTENT_CACHE_SIZE = 512  # Message bodies kept in memory (they never change upstream)
+DOMAINS_TTL = 3600        # Seconds before the domain list is fetched again
+REQUEST_TIMEOUT = 15      # Per-request timeout; waits cap it to the time left
+
+# Extraction patterns, compiled once at import
+_CODE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'verification code[:\s]+([A-Z0-9]{4,8})',
+    r'verify[:\s]+([A-Z0-9]{4,8})',
+    r'code[:\s]+([A-Z0-9]{4,8})',
+    r'([A-Z0-9]{6})',  # 6-digit codes
+    r'([0-9]{4,6})',   # 4-6 digit numbers
+)]
+
+_LINK_PATTERNS = [_link_re.compile('(?i)' + p) for p in (
+    r'https?://[^\s<>"{}|\\^`\[\]]+(?:verify|confirm|activate|validation|auth)[^\s<>"{}|\\^`\[\]]*',
+    r'https?://[^\s<>"{}|\\^`\[\]]*(?:verify|confirm|activate|validation|auth)[^\s<>"{}|\\^`\[\]]+',
+    r'https?://[^\s<>"{}|\\^`\[\]]+/[^\s<>"{}|\\^`\[\]]*(?:token|code|key)[^\s<>"{}|\\^`\[\]]*',
+)]
+
+_ALL_LINKS_RE = _link_re.compile(r'(?i)https?://[^\s<>"{}|\\^`\[\]]+')
+
+_EMAIL_RE = _link_re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+
+# Wait loops re-extract the same bodies on every poll, so memoize by text
+@lru_cache(maxsize=512)
+def _find_code(text):
+    for pattern in _CODE_PATTERNS:
+        matches = pattern.findall(text)
+        if matches:
+            return matches[0]
+    return None
+
+@lru_cache(maxsize=512)
+def _find_verification_links(text):
+    links = set()
+    for pattern in _LINK_PATTERNS:
+        links.update(pattern.findall(text))
+    return tuple(links)
+
+@lru_cache(maxsize=512)
+def _find_all_links(text):
+    return tuple(set(_ALL_LINKS_RE.findall(text)))
+
+@lru_cache(maxsize=512)
+def _links_and_emails(text, text_len):
+    """Links and addresses for extract_all; returns (verification links, all links, emails).
+    
+    Two scans: one link scan, with verification links taken from each link
+    found, and one address scan over the first text_len characters (the
+    plain text body), as in extract_email_addresses. They stay separate
+    because a single alternation consumes overlapping matches, e.g. an
+    address inside a URL, or an address running straight into one.
+    """
+    all_links, verify_links = set(), set()
+    for link in _ALL_LINKS_RE.findall(text):
+        all_links.add(link)
+        for pattern in _LINK_PATTERNS:
+            verify = pattern.search(link)
+            if verify:
+                verify_links.add(verify.group())
+    emails = set(_EMAIL_RE.findall(text[:text_len]))
+    return tuple(verify_links), tuple(all_links), tuple(emails)
+
+def _html_scan_text(html):
+    """Link hrefs and visible text of an HTML part; markup and CSS are dropped"""
+    tree = HTMLParser(html)
+    parts = [node.attributes.get('href') or '' for node in tree.css('a[href]')]
+    if tree.body is not None:
+        parts.append(tree.body.text(separator=' '))
+    return " ".join(parts)
+
+def _shut_at(response, deadline):
+    """Shut a streamed response's socket down at deadline; returns the started timer.
+    
+    Every heartbeat resets the read timeout, so only this bounds a read
+    that is still blocked when the deadline passes.
+    """
+    def shut():
+        sock = getattr(getattr(response.raw, '_connection', None), 'sock', None)
+        try:
+            if sock is None:
+                # Connection: close responses hand the socket to http.client's reader
+                sock = response.raw._fp.fp.raw._sock
+            sock.shutdown(socket.SHUT_RDWR)  # Wakes the blocked read with EOF
+        except (AttributeError, OSError):
+            pass
+    timer = threading.Timer(max(0, deadline - time.time()), shut)
+    timer.daemon = True
+    timer.start()
+    return timer
 
 class TempMailService:
-    def __init__(self):
+    def __init__(self, poll_interval=2.0, poll_interval_max=10.0):
         self.base_url = 'https://api.mail.tm'
+        self.mercure_url = 'https://mercure.mail.tm/.well-known/mercure'
+        # wait_for_* polling starts at poll_interval and backs off to poll_interval_max
+        self.poll_interval = poll_interval
+        self.poll_interval_max = poll_interval_max
         self.session = requests.Session()
+        # Keep-alive pool shared by every call; retry transient upstream errors.
+        # Only GETs are replayed (a repeated POST /accounts answers 422), and
+        # read timeouts never are
+        retry = Retry(
+            total=5,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True  # Honour mail.tm's rate-limit back-off
+        )
+        self.session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=retry))
+        # Requests made during a wait go out once: retries and Retry-After sleeps
+        # would run past the deadline, and _wait_until re-polls on its own anyway
+        self._wait_session = requests.Session()
+        self._wait_session.headers = self.session.headers  # Same dict, so auth updates apply
+        self._wait_session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=0))
         self.current_email = None
         self.current_password = None
         self.auth_token = None
+        self.account_id = None  # Mercure topic for push updates
+        self._domains_cache = None
+        self._domains_cache_ts = 0
+        self._content_cache = OrderedDict()  # message id -> parsed content, LRU order
+        self._scan_texts = {}  # message id -> text and HTML parts joined for the extractors
+        self._inbox_cache = None  # last /messages result, for conditional GETs
+        self._cache_lock = threading.Lock()  # Pool threads fill the caches concurrently
+        self._executor = ThreadPoolExecutor(max_workers=8)  # Concurrent message fetches
         
         # Set headers
         self.session.headers.update({
@@ -33,20 +175,26 @@ class TempMailService:
     
     def get_available_domains(self):
         """Get list of available email domains"""
+        if self._domains_cache and time.time() - self._domains_cache_ts < DOMAINS_TTL:
+            return self._domains_cache
+        
         try:
             response = self.session.get(f"{self.base_url}/domains", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                # Handle both response formats
-                if isinstance(data, dict) and 'data' in data:
-                    domains = data['data']
-                elif isinstance(data, list):
-                    domains = data
-                else:
-                    return []
-                
-                return [domain.get('domain', domain) if isinstance(domain, dict) else str(domain) for domain in domains]
-            return []
+            response.raise_for_status()
+            data = loads(response.content)
+            # Handle both response formats
+            if isinstance(data, dict) and 'data' in data:
+                domains = data['data']
+            elif isinstance(data, list):
+                domains = data
+            else:
+                return []
+            
+            domains = [domain.get('domain', domain) if isinstance(domain, dict) else str(domain) for domain in domains]
+            if domains:
+                self._domains_cache = domains
+                self._domains_cache_ts = time.time()
+            return domains
         except Exception as e:
             print(f"Error getting domains: {e}")
             return []
@@ -60,10 +208,10 @@ class TempMailService:
                 return None
                 
             # Generate random email
-            username = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
+            username = secrets.token_hex(4)  # 8 lowercase hex chars
             domain = random.choice(domains)
             email = f"{username}@{domain}"
-            password = ''.join(random.choices(string.ascii_letters + string.digits, k=12))
+            password = secrets.token_urlsafe(9)  # 12 chars from os.urandom
             
             # Create account
             payload = {
@@ -72,117 +220,169 @@ class TempMailService:
             }
             
             response = self.session.post(f"{self.base_url}/accounts", json=payload, timeout=15)
+            response.raise_for_status()
+            account_id = loads(response.content).get('id')
             
-            if response.status_code == 201:
-                # Get auth token
-                token_response = self.session.post(f"{self.base_url}/token", json={
-                    "address": email,
-                    "password": password
-                }, timeout=15)
-                
-                if token_response.status_code == 200:
-                    token_data = token_response.json()
-                    self.auth_token = token_data.get('token')
-                    self.current_email = email
-                    self.current_password = password
-                    
-                    # Update session headers with auth
-                    self.session.headers.update({
-                        'Authorization': f'Bearer {self.auth_token}'
-                    })
-                    
-                    return {
-                        'email': email,
-                        'password': password,
-                        'status': 'success',
-                        'created_at': datetime.now().isoformat()
-                    }
+            # Get auth token
+            token_response = self.session.post(f"{self.base_url}/token", json={
+                "address": email,
+                "password": password
+            }, timeout=15)
             
-            return None
+            token_response.raise_for_status()
+            token_data = loads(token_response.content)
+            self.auth_token = token_data.get('token')
+            self.account_id = account_id or token_data.get('id')
+            self.current_email = email
+            self.current_password = password
+            with self._cache_lock:
+                self._content_cache.clear()
+                self._scan_texts.clear()
+            
+            # Update session headers with auth
+            self.session.headers.update({
+                'Authorization': f'Bearer {self.auth_token}'
+            })
+            
+            return {
+                'email': email,
+                'password': password,
+                'status': 'success',
+                'created_at': datetime.now().isoformat()
+            }
         except Exception as e:
             print(f"Error generating email: {e}")
             return None
     
-    def check_messages(self, timeout=30):
+    def _spawn(self):
+        """Service for another inbox sharing this one's connection pool, fetch pool and domains"""
+        other = TempMailService(self.poll_interval, self.poll_interval_max)
+        other.session.mount('https://', self.session.get_adapter(self.base_url))
+        other._wait_session.mount('https://', self._wait_session.get_adapter(self.base_url))
+        other._executor = self._executor
+        other._domains_cache, other._domains_cache_ts = self._domains_cache, self._domains_cache_ts
+        return other
+    
+    def batch_generate(self, n):
+        """Generate n inboxes concurrently; returns one service per inbox created.
+        
+        Each returned service carries its own account (email, token, caches)
+        so inboxes can be polled in parallel over the shared connection pool.
+        """
+        self.get_available_domains()  # Fetched once, shared by every spawn
+        services = [self._spawn() for _ in range(n)]
+        results = list(self._executor.map(lambda service: service.generate_email(), services))
+        return [service for service, result in zip(services, results) if result]
+    
+    def _get(self, url, timeout, deadline=None, **kwargs):
+        """GET with retries, or - inside a wait (deadline set) - once and within the time left"""
+        if deadline is None:
+            return self.session.get(url, timeout=timeout, **kwargs)
+        return self._wait_session.get(url, timeout=min(timeout, self._request_timeout(deadline)), **kwargs)
+    
+    def check_messages(self, timeout=REQUEST_TIMEOUT, deadline=None):
         """Check for new messages in current email"""
         if not self.auth_token or not self.current_email:
             return []
         
+        # (email, etag, body digest, parsed list) from the last successful check
+        cached = self._inbox_cache
+        if cached and cached[0] != self.current_email:
+            cached = None
+        
         try:
-            headers = {'Authorization': f'Bearer {self.auth_token}'}
-            response = self.session.get(f"{self.base_url}/messages", headers=headers, timeout=15)
+            headers = {'If-None-Match': cached[1]} if cached and cached[1] else None
+            response = self._get(f"{self.base_url}/messages", timeout, deadline, headers=headers)
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Handle both response formats
-                if isinstance(data, dict) and 'data' in data:
-                    messages = data['data']
-                elif isinstance(data, list):
-                    messages = data
-                else:
-                    return []
-                
-                message_list = []
-                for msg in messages:
-                    if isinstance(msg, dict):
-                        from_info = msg.get('from', {})
-                        from_address = from_info.get('address', '') if isinstance(from_info, dict) else str(from_info)
-                        
-                        message_list.append({
-                            'id': msg.get('id'),
-                            'from': from_address,
-                            'subject': msg.get('subject', ''),
-                            'received_at': msg.get('createdAt', ''),
-                            'preview': msg.get('intro', '')[:100] if msg.get('intro') else ''
-                        })
-                
-                return message_list
-            return []
+            if response.status_code == 304 and cached:
+                return list(cached[3])
+            response.raise_for_status()
+            
+            # Unchanged inbox: skip parsing even when upstream sends no ETag
+            digest = hashlib.blake2b(response.content, digest_size=16).digest()
+            if cached and cached[2] == digest:
+                return list(cached[3])
+            
+            data = loads(response.content)
+            
+            # Handle both response formats
+            if isinstance(data, dict) and 'data' in data:
+                messages = data['data']
+            elif isinstance(data, list):
+                messages = data
+            else:
+                return []
+            
+            message_list = []
+            for msg in messages:
+                if isinstance(msg, dict):
+                    from_info = msg.get('from', {})
+                    from_address = from_info.get('address', '') if isinstance(from_info, dict) else str(from_info)
+                    
+                    message_list.append({
+                        'id': msg.get('id'),
+                        'from': from_address,
+                        'subject': msg.get('subject', ''),
+                        'received_at': msg.get('createdAt', ''),
+                        'preview': msg.get('intro', '')[:100] if msg.get('intro') else ''
+                    })
+            
+            self._inbox_cache = (self.current_email, response.headers.get('ETag'), digest, message_list)
+            return list(message_list)
         except Exception as e:
             print(f"Error checking messages: {e}")
             return []
     
-    def get_message_content(self, message_id):
+    def get_message_content(self, message_id, timeout=REQUEST_TIMEOUT, deadline=None):
         """Get full content of a specific message"""
         if not self.auth_token:
             return None
         
+        with self._cache_lock:
+            content = self._content_cache.get(message_id)
+            if content is not None:
+                self._content_cache.move_to_end(message_id)
+                return content
+        
         try:
-            headers = {'Authorization': f'Bearer {self.auth_token}'}
-            response = self.session.get(f"{self.base_url}/messages/{message_id}", headers=headers, timeout=15)
+            response = self._get(f"{self.base_url}/messages/{message_id}", timeout, deadline)
+            response.raise_for_status()
+            msg_data = loads(response.content)
             
-            if response.status_code == 200:
-                msg_data = response.json()
-                
-                # Handle from field safely
-                from_info = msg_data.get('from', {})
-                from_address = from_info.get('address', '') if isinstance(from_info, dict) else str(from_info)
-                
-                # Handle HTML content safely
-                html_content = msg_data.get('html', [])
-                if isinstance(html_content, str):
-                    html_content = [html_content]
-                elif not isinstance(html_content, list):
-                    html_content = []
-                
-                return {
-                    'id': msg_data.get('id'),
-                    'from': from_address,
-                    'subject': msg_data.get('subject', ''),
-                    'html_content': html_content,
-                    'text_content': msg_data.get('text', ''),
-                    'received_at': msg_data.get('createdAt', '')
-                }
-            return None
+            # Handle from field safely
+            from_info = msg_data.get('from', {})
+            from_address = from_info.get('address', '') if isinstance(from_info, dict) else str(from_info)
+            
+            # Handle HTML content safely
+            html_content = msg_data.get('html', [])
+            if isinstance(html_content, str):
+                html_content = [html_content]
+            elif not isinstance(html_content, list):
+                html_content = []
+            
+            content = {
+                'id': msg_data.get('id'),
+                'from': from_address,
+                'subject': msg_data.get('subject', ''),
+                'html_content': html_content,
+                'text_content': msg_data.get('text', ''),
+                'received_at': msg_data.get('createdAt', '')
+            }
+            # Join the parts once per fetch; every extractor scans this string
+            scan_text = self._join_parts(content)
+            with self._cache_lock:
+                self._content_cache[message_id] = content
+                self._scan_texts[content['id']] = scan_text
+                if len(self._content_cache) > CONTENT_CACHE_SIZE:
+                    _, evicted = self._content_cache.popitem(last=False)
+                    self._scan_texts.pop(evicted['id'], None)
+            return content
         except Exception as e:
             print(f"Error getting message content: {e}")
             return None
     
     def extract_verification_code(self, message_content):
         """Extract verification code from message content"""
-        import re
-        
         if not message_content:
             return None
         
@@ -190,83 +390,60 @@ class TempMailService:
         if not text:
             return None
         
-        # Common verification code patterns
-        patterns = [
-            r'verification code[:\s]+([A-Z0-9]{4,8})',
-            r'verify[:\s]+([A-Z0-9]{4,8})',
-            r'code[:\s]+([A-Z0-9]{4,8})',
-            r'([A-Z0-9]{6})',  # 6-digit codes
-            r'([0-9]{4,6})',   # 4-6 digit numbers
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                return matches[0]
-        
-        return None
+        return _find_code(text)
+    
+    def _join_parts(self, message_content):
+        """Text body followed by every HTML part, space separated"""
+        parts = [message_content.get('text_content', '') or '']
+        html_parts = [part for part in message_content.get('html_content') or [] if isinstance(part, str)]
+        if HTMLParser is not None:
+            html_parts = [_html_scan_text(part) for part in html_parts]
+        parts.extend(html_parts)
+        return " ".join(parts)
+    
+    def _combined_text(self, message_content):
+        """Scan text for a message, reusing the one joined at fetch time"""
+        text = self._scan_texts.get(message_content.get('id'))
+        if text is None:
+            text = self._join_parts(message_content)
+        return text
     
     def extract_verification_links(self, message_content):
         """Extract verification/confirmation links from message content"""
-        import re
-        
         if not message_content:
             return []
         
-        # Get both HTML and text content
-        html_content = message_content.get('html_content', [])
-        text_content = message_content.get('text_content', '')
-        
-        # Combine all content
-        all_content = text_content
-        if html_content:
-            for html_part in html_content:
-                if isinstance(html_part, str):
-                    all_content += " " + html_part
+        all_content = self._combined_text(message_content)
         
-        # Link patterns for verification
-        link_patterns = [
-            r'https?://[^\s<>"{}|\\^`\[\]]+(?:verify|confirm|activate|validation|auth)[^\s<>"{}|\\^`\[\]]*',
-            r'https?://[^\s<>"{}|\\^`\[\]]*(?:verify|confirm|activate|validation|auth)[^\s<>"{}|\\^`\[\]]+',
-            r'https?://[^\s<>"{}|\\^`\[\]]+/[^\s<>"{}|\\^`\[\]]*(?:token|code|key)[^\s<>"{}|\\^`\[\]]*',
-        ]
-        
-        links = []
-        for pattern in link_patterns:
-            matches = re.findall(pattern, all_content, re.IGNORECASE)
-            links.extend(matches)
-        
-        # Remove duplicates and return
-        return list(set(links))
+        # Duplicates removed by the cached helper
+        return list(_find_verification_links(all_content))
     
     def extract_all_links(self, message_content):
         """Extract all links from message content"""
-        import re
-        
         if not message_content:
             return []
         
-        # Get both HTML and text content
-        html_content = message_content.get('html_content', [])
-        text_content = message_content.get('text_content', '')
-        
-        # Combine all content
-        all_content = text_content
-        if html_content:
-            for html_part in html_content:
-                if isinstance(html_part, str):
-                    all_content += " " + html_part
+        all_content = self._combined_text(message_content)
         
         # Extract all HTTP/HTTPS links
-        link_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-        links = re.findall(link_pattern, all_content, re.IGNORECASE)
+        return list(_find_all_links(all_content))
+    
+    def extract_all(self, message_content):
+        """Extract code, verification links, all links and addresses (links scanned once)"""
+        if not message_content:
+            return {'verification_code': None, 'verification_links': [], 'all_links': [], 'email_addresses': []}
         
-        return list(set(links))
+        text_len = len(message_content.get('text_content', '') or '')
+        verify_links, all_links, emails = _links_and_emails(self._combined_text(message_content), text_len)
+        return {
+            'verification_code': self.extract_verification_code(message_content),
+            'verification_links': list(verify_links),
+            'all_links': list(all_links),
+            'email_addresses': list(emails)
+        }
     
     def extract_email_addresses(self, message_content):
         """Extract email addresses from message content"""
-        import re
-        
         if not message_content:
             return []
         
@@ -274,22 +451,19 @@ class TempMailService:
         if not text:
             return []
         
-        # Email pattern
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
-        
-        return list(set(emails))
+        return list(set(_EMAIL_RE.findall(text)))
     
     def parse_message_content(self, message_content):
         """Parse message content and extract all useful information"""
         if not message_content:
             return {}
         
+        extracted = self.extract_all(message_content)
         parsed = {
-            'verification_code': self.extract_verification_code(message_content),
-            'verification_links': self.extract_verification_links(message_content),
-            'all_links': self.extract_all_links(message_content),
-            'email_addresses': self.extract_email_addresses(message_content),
+            'verification_code': extracted['verification_code'],
+            'verification_links': extracted['verification_links'],
+            'all_links': extracted['all_links'],
+            'email_addresses': extracted['email_addresses'],
             'sender': message_content.get('from'),
             'subject': message_content.get('subject'),
             'received_at': message_content.get('received_at'),
@@ -298,15 +472,116 @@ class TempMailService:
         
         return parsed
     
+    def _fetch_contents(self, messages, deadline):
+        """Fetch message bodies concurrently, yielding (message, content) in inbox order.
+        
+        Results come back newest first regardless of which fetch finishes
+        first, so a wait always reports the newest matching message.
+        """
+        # Bodies already cached skip the pool; only unseen ones cost a request
+        with self._cache_lock:
+            contents = [self._content_cache.get(m['id']) for m in messages]
+        pending = [i for i, content in enumerate(contents) if content is None]
+        futures = {i: self._executor.submit(self.get_message_content, messages[i]['id'], deadline=deadline) for i in pending}
+        try:
+            for i, message in enumerate(messages):
+                content = contents[i]
+                if content is None:
+                    content = futures[i].result()
+                yield message, content
+        finally:
+            # Caller returned early (match found) - drop fetches not started yet
+            for future in futures.values():
+                future.cancel()
+    
+    @staticmethod
+    def _request_timeout(deadline):
+        """Per-request timeout that never runs past the overall wait deadline"""
+        return max(0.1, min(REQUEST_TIMEOUT, deadline - time.time()))
+    
+    def _open_updates(self, deadline):
+        """Open the Mercure push stream for the current account, or return None"""
+        if not self.account_id:
+            return None
+        
+        # Read timeout = remaining budget, so a silent stream can't outlive the wait
+        remaining = max(0.1, deadline - time.time())
+        try:
+            response = self._wait_session.get(
+                self.mercure_url,
+                params={'topic': f'/accounts/{self.account_id}'},
+                headers={'Accept': 'text/event-stream'},
+                stream=True,
+                timeout=(min(10, remaining), remaining)
+            )
+        except requests.exceptions.RequestException:
+            return None
+        if response.status_code != 200:
+            response.close()
+            return None
+        return response
+    
+    def _iter_updates(self, stream, deadline):
+        """Yield once per event received on the Mercure stream, stopping at deadline"""
+        has_data = False
+        # chunk_size=1: the default 512-byte reads would sit on small heartbeats and
+        # events until enough bytes pile up on a stream without chunked encoding
+        for line in stream.iter_lines(chunk_size=1, decode_unicode=True):
+            # Stop at the deadline even if heartbeats keep the stream busy
+            if time.time() >= deadline:
+                return
+            if line and line.startswith('data:'):
+                has_data = True
+            elif not line and has_data:
+                has_data = False
+                yield
+    
+    def _wait_until(self, match, deadline):
+        """Re-check the inbox until match(messages, deadline) returns a result or deadline passes.
+        
+        With the Mercure stream open, checks happen only when the server
+        announces an update; otherwise (or once the stream drops) polling
+        backs off from poll_interval to poll_interval_max.
+        """
+        # Opened before the first check so nothing can arrive unannounced in between
+        stream = self._open_updates(deadline)
+        updates = self._iter_updates(stream, deadline) if stream is not None else None
+        shutdown = _shut_at(stream, deadline) if stream is not None else None
+        interval, last_count = self.poll_interval, None
+        
+        try:
+            while time.time() < deadline:
+                # Each request gets at most the time left, so one poll can't overrun the wait
+                messages = self.check_messages(deadline=deadline)
+                result = match(messages, deadline)
+                if result:
+                    return result
+                
+                if updates is not None:
+                    try:
+                        next(updates)  # Blocks until the next push event
+                        continue
+                    except (StopIteration, requests.exceptions.RequestException):
+                        updates = None  # Stream closed or timed out - poll instead
+                
+                if len(messages) != last_count:
+                    # Inbox changed - go back to polling quickly
+                    interval, last_count = self.poll_interval, len(messages)
+                remaining = deadline - time.time()
+                if remaining > 0:
+                    time.sleep(min(interval, remaining))
+                interval = min(interval * 1.5, self.poll_interval_max)
+        finally:
+            if stream is not None:
+                shutdown.cancel()
+                stream.close()
+        
+        return None
+    
     def wait_for_verification_code(self, timeout=60):
         """Wait for verification code in new messages"""
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
-            messages = self.check_messages()
-            
-            for message in messages:
-                content = self.get_message_content(message['id'])
+        def match(messages, deadline):
+            for message, content in self._fetch_contents(messages, deadline):
                 if content:
                     code = self.extract_verification_code(content)
                     if code:
@@ -316,20 +591,14 @@ class TempMailService:
                             'message': content,
                             'found_at': datetime.now().isoformat()
                         }
-            
-            time.sleep(2)  # Wait 2 seconds before checking again
+            return None
         
-        return None
+        return self._wait_until(match, time.time() + timeout)
     
     def wait_for_verification_link(self, timeout=60):
         """Wait for verification/confirmation links in new messages"""
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
-            messages = self.check_messages()
-            
-            for message in messages:
-                content = self.get_message_content(message['id'])
+        def match(messages, deadline):
+            for message, content in self._fetch_contents(messages, deadline):
                 if content:
                     links = self.extract_verification_links(content)
                     if links:
@@ -340,20 +609,14 @@ class TempMailService:
                             'message': content,
                             'found_at': datetime.now().isoformat()
                         }
-            
-            time.sleep(2)
+            return None
         
-        return None
+        return self._wait_until(match, time.time() + timeout)
     
     def wait_for_any_verification(self, timeout=60):
         """Wait for any type of verification (code or link)"""
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
-            messages = self.check_messages()
-            
-            for message in messages:
-                content = self.get_message_content(message['id'])
+        def match(messages, deadline):
+            for message, content in self._fetch_contents(messages, deadline):
                 if content:
                     # Parse all content
                     parsed = self.parse_message_content(content)
@@ -376,24 +639,21 @@ class TempMailService:
                             'parsed_content': parsed,
                             'found_at': datetime.now().isoformat()
                         }
-            
-            time.sleep(2)
+            return None
         
-        return None
+        return self._wait_until(match, time.time() + timeout)
     
     def wait_for_new_email(self, timeout=60):
         """Wait for any new email and return full parsed content"""
-        start_time = time.time()
-        initial_count = len(self.check_messages())
+        deadline = time.time() + timeout
+        initial_count = len(self.check_messages(deadline=deadline))
         
-        while time.time() - start_time < timeout:
-            messages = self.check_messages()
-            
+        def match(messages, deadline):
             # Check if we have new messages
             if len(messages) > initial_count:
                 # Get the latest message
                 latest_message = messages[0]  # Most recent first
-                content = self.get_message_content(latest_message['id'])
+                content = self.get_message_content(latest_message['id'], deadline=deadline)
                 if content:
                     parsed = self.parse_message_content(content)
                     return {
@@ -402,10 +662,13 @@ class TempMailService:
                         'raw_content': content,
                         'found_at': datetime.now().isoformat()
                     }
-            
-            time.sleep(2)
+            return None
         
-        return None
+        return self._wait_until(match, deadline)
+    
+    def warm_up(self):
+        """Open the pooled HTTPS connection and prime the domain cache ahead of the first request"""
+        self.get_available_domains()
     
     def get_status(self):
         """Get current service status"""